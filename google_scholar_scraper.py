@@ -5,22 +5,133 @@ Designed for M1 MacBook - Educational Purpose Only
 """
 
 import requests
-from bs4 import BeautifulSoup
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+from lxml import html
+from lxml.etree import ParserError, XPath
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import time
 import random
 import csv
-import pandas as pd
+import gzip
+import re
+import os
+from openpyxl import Workbook
 import urllib.parse
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+def _class_is(name):
+    """XPath predicate matching one token of the class attribute"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Precompiled XPath expressions for a Google Scholar result page;
+# normalize-space() trims and collapses whitespace inside libxml2
+XP_PAPERS = XPath(f"//div[{_class_is('gs_ri')}]")
+XP_TITLE = XPath(f"normalize-space(.//h3[{_class_is('gs_rt')}])", smart_strings=False)
+XP_LINK = XPath(f".//h3[{_class_is('gs_rt')}]//a/@href", smart_strings=False)
+XP_AUTH = XPath(f"normalize-space(.//div[{_class_is('gs_a')}])", smart_strings=False)
+XP_CITED = XPath(
+    f"normalize-space((.//div[{_class_is('gs_fl')}]//a[starts-with(normalize-space(text()), 'Cited by ')])[1])",
+    smart_strings=False
+)
+XP_ABS = XPath(f"normalize-space(.//div[{_class_is('gs_rs')}])", smart_strings=False)
+CITED_PREFIX_LEN = len('Cited by ')
+# Column order used for every exported file
+RESULT_FIELDS = ('title', 'authors', 'journal', 'year', 'citations', 'doi', 'url', 'abstract')
+_YEAR_RE = re.compile(r'\b(?:20\d{2}|19\d{2})\b')
+
+class RequestSkipped(requests.RequestException):
+    """Raised when a throttled request is no longer wanted once its slot comes up"""
+
+class ThrottledRetry(Retry):
+    """Retry policy that calls before_retry() after its backoff, ahead of every retried attempt"""
+    def __init__(self, *args, before_retry=None, **kwargs):
+        self.before_retry = before_retry
+        super().__init__(*args, **kwargs)
+    
+    def new(self, **kw):
+        # urllib3 builds a fresh Retry per attempt; carry the hook over
+        retry = super().new(**kw)
+        retry.before_retry = self.before_retry
+        return retry
+    
+    def sleep(self, response=None):
+        super().sleep(response)
+        if self.before_retry:
+            self.before_retry()
+
+class ThrottledAdapter(HTTPAdapter):
+    """HTTPAdapter that calls before_send() ahead of every request that reaches the network;
+    urllib3 retries inside send(), so they are throttled by ThrottledRetry instead"""
+    def __init__(self, before_send, **kwargs):
+        self.before_send = before_send
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        # requests-cache answers hits itself, so only real network requests get here
+        self.before_send()
+        return super().send(request, **kwargs)
+
+def _has_results(response):
+    """Cache filter: keep only pages that list papers, never a CAPTCHA or empty page"""
+    return b'gs_ri' in response.content
+
 class GoogleScholarScraper:
-    def __init__(self):
+    def __init__(self, cache_name='scholar_cache'):
         self.base_url = "https://scholar.google.com/scholar"
-        self.session = requests.Session()
-        self.results = []
+        # Result pages are cached for a day in the per-user cache directory (unless cache_name
+        # is an absolute path), so repeated searches skip the network
+        self.session = requests_cache.CachedSession(
+            cache_name,
+            backend='sqlite',
+            use_cache_dir=True,
+            expire_after=86400,
+            allowable_methods=('GET',),
+            filter_fn=_has_results
+        )
+        self.reset_results()
+        self.max_workers = 4  # concurrent page fetches
+        
+        # One reusable parser for result pages, with features the extractor never uses switched off.
+        # Pages are only parsed in the thread running scrape_papers, never by the fetch workers.
+        self.parser = html.HTMLParser(remove_comments=True, remove_pis=True, collect_ids=False)
+        
+        # Shared throttle: earliest time the next request may be sent
+        self._next_allowed = 0.0
+        self._rate_lock = threading.Lock()
+        self._local = threading.local()  # per-thread skip callback for the request in flight
+        
+        # Keep-alive connection pool sized for the fetch workers, with retries on throttling.
+        # The throttle runs inside the adapter and before each retry, so every request that
+        # reaches the network waits for a slot and cache hits never do.
+        adapter = ThrottledAdapter(
+            self.before_send,
+            pool_connections=8,
+            pool_maxsize=8,
+            max_retries=ThrottledRetry(
+                total=2,
+                backoff_factor=1.0,
+                status_forcelist=[429, 502, 503, 504],
+                before_retry=self.before_send
+            )
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Static headers are set once; only the User-Agent changes per request
+        self.session.headers.update({
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            # gzip/deflate, plus brotli (and zstd) when a decoder is installed
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        })
         
         # User-agent rotation to avoid detection
         self.user_agents = [
@@ -30,158 +141,237 @@ class GoogleScholarScraper:
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         ]
     
+    def reset_results(self):
+        """Start an empty column-oriented result store (one list per field)"""
+        self.results = {field: [] for field in RESULT_FIELDS}
+    
+    def result_count(self):
+        """Number of papers currently stored"""
+        return len(self.results['title'])
+    
+    def result_rows(self):
+        """Iterate stored papers as tuples in RESULT_FIELDS order"""
+        return zip(*(self.results[field] for field in RESULT_FIELDS))
+    
     def create_boolean_query(self, keywords, operator="AND"):
         """Create Google Scholar query with Boolean operators"""
-        if operator.upper() == "AND":
-            query = " AND ".join([f'"{kw.strip()}"' for kw in keywords])
-        elif operator.upper() == "OR":
-            query = " OR ".join([f'"{kw.strip()}"' for kw in keywords])
-        else:
-            query = " ".join(keywords)
-        return query
+        operator = operator.upper()
+        if operator in ("AND", "OR"):
+            return f" {operator} ".join('"%s"' % kw.strip() for kw in keywords)
+        return " ".join(kw.strip() for kw in keywords)
     
     def get_random_delay(self, min_delay=2, max_delay=5):
         """Random delay to avoid rate limiting"""
         return random.uniform(min_delay, max_delay)
     
-    def make_request(self, url, params=None):
-        """Make HTTP request with anti-blocking measures"""
-        headers = {
-            'User-Agent': random.choice(self.user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+    def wait_for_slot(self):
+        """Block until this thread may send a request, spacing requests across all workers"""
+        with self._rate_lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next_allowed - now)
+            self._next_allowed = max(now, self._next_allowed) + self.get_random_delay()
+        time.sleep(wait)
+    
+    def before_send(self):
+        """Throttle a request that is about to go to the network, dropping it if no longer wanted"""
+        skip = getattr(self._local, 'skip', None)
+        # Checked before reserving a slot too, so an unwanted request neither sleeps nor
+        # pushes back the slots of the requests after it
+        if skip and skip():
+            raise RequestSkipped()
+        self.wait_for_slot()
+        if skip and skip():
+            raise RequestSkipped()
+    
+    def make_request(self, url, params=None, skip=None):
+        """Make HTTP request with anti-blocking measures; returns None if skip() is true once a slot is free"""
+        headers = {'User-Agent': random.choice(self.user_agents)}
+        self._local.skip = skip
         
         try:
             response = self.session.get(url, params=params, headers=headers, timeout=10)
-            time.sleep(self.get_random_delay())
             return response
+        except RequestSkipped:
+            return None
         except requests.RequestException as e:
             print(f"Request failed: {e}")
             return None
     
     def extract_paper_data(self, paper_div):
         """Extract data from individual paper result"""
-        data = {
-            'title': '',
-            'authors': '',
-            'journal': '',
-            'year': '',
-            'citations': '',
-            'doi': '',
-            'url': '',
-            'abstract': ''
-        }
+        data = dict.fromkeys(RESULT_FIELDS, '')
         
         try:
             # Title and URL
-            title_tag = paper_div.find('h3', class_='gs_rt')
-            if title_tag:
-                data['title'] = title_tag.get_text().strip()
-                link_tag = title_tag.find('a')
-                if link_tag and link_tag.get('href'):
-                    data['url'] = link_tag['href']
+            data['title'] = XP_TITLE(paper_div)
+            links = XP_LINK(paper_div)
+            if links:
+                data['url'] = links[0]
             
             # Authors, Journal, Year
-            author_info = paper_div.find('div', class_='gs_a')
-            if author_info:
-                author_text = author_info.get_text()
-                data['authors'] = author_text.strip()
+            author_text = XP_AUTH(paper_div)
+            if author_text:
+                data['authors'] = author_text
                 
                 # Try to extract year
-                import re
-                year_match = re.search(r'\b(20\d{2}|19\d{2})\b', author_text)
+                year_match = _YEAR_RE.search(author_text)
                 if year_match:
-                    data['year'] = year_match.group(1)
+                    data['year'] = year_match.group(0)
             
             # Citations
-            citation_div = paper_div.find('div', class_='gs_fl')
-            if citation_div:
-                citation_links = citation_div.find_all('a')
-                for link in citation_links:
-                    if 'Cited by' in link.get_text():
-                        citation_text = link.get_text()
-                        citation_count = citation_text.replace('Cited by ', '')
-                        data['citations'] = citation_count
-                        break
+            cited = XP_CITED(paper_div)
+            if cited:
+                data['citations'] = cited[CITED_PREFIX_LEN:]
             
             # Abstract/Snippet
-            abstract_div = paper_div.find('div', class_='gs_rs')
-            if abstract_div:
-                data['abstract'] = abstract_div.get_text().strip()
+            data['abstract'] = XP_ABS(paper_div)
         
         except Exception as e:
             print(f"Error extracting paper data: {e}")
         
         return data
     
+    def parse_page(self, response):
+        """Parse a result page and return its paper divs (none for a blank page)"""
+        # Parsed from the buffered body, not streamed from response.raw: CachedSession reads and
+        # decodes every response it stores, so streaming saves nothing, and re-reading the
+        # rewound raw stream would run the Content-Encoding decoder a second time
+        try:
+            tree = html.fromstring(response.content, parser=self.parser)
+        except ParserError:
+            # Empty, whitespace-only or comment-only body: treat as a page with no results
+            return []
+        return XP_PAPERS(tree)
+    
     def scrape_papers(self, keywords, boolean_operator="AND", max_results=100, year_from=2015, year_to=2025, progress_callback=None):
         """Main scraping function"""
         query = self.create_boolean_query(keywords, boolean_operator)
-        self.results = []
+        self.reset_results()
         
         params = {
             'q': query,
             'as_ylo': year_from,
             'as_yhi': year_to,
-            'start': 0
         }
         
         papers_per_page = 10
         total_pages = (max_results + papers_per_page - 1) // papers_per_page
+        param_list = [dict(params, start=page * papers_per_page) for page in range(total_pages)]
+        
+        # Fetch pages concurrently, parsing each one as soon as it arrives
+        page_results = {}
+        first_empty = total_pages  # lowest page known to have no results
+        
+        def fetch(page, page_params):
+            # A page past the end of the results is dropped once its throttle slot comes up
+            return self.make_request(self.base_url, page_params, skip=lambda: page > first_empty)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(fetch, page, page_params): page
+                for page, page_params in enumerate(param_list)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                page = futures[future]
+                if page > first_empty:
+                    continue  # cancelled or skipped
+                
+                if progress_callback:
+                    progress_callback(f"Scraped page {page + 1} ({done} of {total_pages})...")
+                
+                response = future.result()
+                if not response or response.status_code != 200:
+                    print(f"Failed to get page {page + 1}")
+                    continue
+                
+                paper_divs = self.parse_page(response)
+                page_results[page] = paper_divs or None
+                
+                # Results end at this page, so stop fetching the pages after it
+                if not paper_divs and page < first_empty:
+                    first_empty = page
+                    for other, other_page in futures.items():
+                        if other_page > page:
+                            other.cancel()
         
+        # Merge pages back in their original order into columns sized for max_results
+        results = {field: [None] * max_results for field in RESULT_FIELDS}
+        count = 0
         for page in range(total_pages):
-            if progress_callback:
-                progress_callback(f"Scraping page {page + 1} of {total_pages}...")
-            
-            params['start'] = page * papers_per_page
-            response = self.make_request(self.base_url, params)
-            
-            if not response or response.status_code != 200:
-                print(f"Failed to get page {page + 1}")
+            if page not in page_results:
                 continue
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            paper_divs = soup.find_all('div', class_='gs_ri')
-            
-            if not paper_divs:
+            paper_divs = page_results[page]
+            if paper_divs is None:
                 print("No more results found")
                 break
             
+            # Papers are extracted in order, so extraction stops as soon as max_results is reached
             for paper_div in paper_divs:
                 paper_data = self.extract_paper_data(paper_div)
-                if paper_data['title']:
-                    self.results.append(paper_data)
-                    if len(self.results) >= max_results:
-                        break
+                if not paper_data['title']:
+                    continue
+                for field in RESULT_FIELDS:
+                    results[field][count] = paper_data[field]
+                count += 1
+                if count >= max_results:
+                    break
             
-            if len(self.results) >= max_results:
+            if count >= max_results:
                 break
         
+        # Trim the unused tail when fewer papers were found
+        for column in results.values():
+            del column[count:]
+        self.results = results
         return self.results
     
     def save_to_csv(self, filename):
-        """Save results to CSV file"""
-        if not self.results:
+        """Save results to CSV file (gzip-compressed when the name ends in .gz)"""
+        if not self.result_count():
             return False
         
-        df = pd.DataFrame(self.results)
-        df.to_csv(filename, index=False, encoding='utf-8')
+        if filename.endswith('.gz'):
+            f = gzip.open(filename, 'wt', newline='', encoding='utf-8', compresslevel=6)
+        else:
+            f = open(filename, 'w', newline='', encoding='utf-8')
+        
+        with f:
+            writer = csv.writer(f)
+            writer.writerow(RESULT_FIELDS)
+            writer.writerows(self.result_rows())
         return True
     
     def save_to_excel(self, filename):
         """Save results to Excel file"""
-        if not self.results:
+        if not self.result_count():
             return False
         
-        df = pd.DataFrame(self.results)
-        df.to_excel(filename, index=False, engine='openpyxl')
+        # Write-only mode streams rows to disk instead of keeping every cell in memory
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Sheet1')
+        ws.append(RESULT_FIELDS)
+        for row in self.result_rows():
+            ws.append(row)
+        wb.save(filename)
         return True
 
+def with_extension(filename, extension):
+    """Give filename the extension of the file type picked in the save dialog, if it lacks it"""
+    if filename.endswith(extension):
+        return filename
+    suffix = os.path.splitext(filename)[1]
+    if not suffix:
+        return filename + extension
+    # e.g. 'results.csv' (Tk's default extension) saved as a gzipped CSV
+    if extension.startswith(suffix):
+        return filename + extension[len(suffix):]
+    return filename
+
 class ScraperGUI:
+    SEP = "-" * 80
+    CSV_EXTENSIONS = {"CSV files": ".csv", "Gzipped CSV files": ".csv.gz"}
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Google Scholar Scraper with Boolean Operators")
@@ -253,9 +443,8 @@ class ScraperGUI:
         main_frame.rowconfigure(10, weight=1)
     
     def update_progress(self, message):
-        """Update progress message"""
-        self.progress_var.set(message)
-        self.root.update_idletasks()
+        """Update progress message (safe to call from the scraping thread)"""
+        self.root.after(0, self.progress_var.set, message)
     
     def start_scraping(self):
         """Start scraping in a separate thread"""
@@ -282,7 +471,7 @@ class ScraperGUI:
         thread.start()
     
     def run_scraping(self, keywords, boolean_operator, max_results, year_from, year_to):
-        """Run scraping process"""
+        """Run scraping process in the worker thread; widget updates are queued with after()"""
         try:
             results = self.scraper.scrape_papers(
                 keywords=keywords,
@@ -293,44 +482,53 @@ class ScraperGUI:
                 progress_callback=self.update_progress
             )
             
-            self.display_results(results)
-            self.update_progress(f"Scraping completed! Found {len(results)} papers.")
+            self.root.after(0, self.display_results, results)
+            self.update_progress(f"Scraping completed! Found {self.scraper.result_count()} papers.")
             
         except Exception as e:
             self.update_progress(f"Error: {str(e)}")
-            messagebox.showerror("Error", f"Scraping failed: {str(e)}")
+            self.root.after(0, messagebox.showerror, "Error", f"Scraping failed: {str(e)}")
         
         finally:
-            self.progress_bar.stop()
-            self.start_button.config(state='normal')
+            self.root.after(0, self.progress_bar.stop)
+            self.root.after(0, self.start_button.config, {'state': 'normal'})
     
     def display_results(self, results):
         """Display results in the text widget"""
-        self.results_text.delete('1.0', tk.END)
+        columns = zip(results['title'], results['authors'], results['year'],
+                      results['citations'], results['url'], results['abstract'])
+        parts = []
+        for i, (title, authors, year, citations, url, abstract) in enumerate(columns, 1):
+            parts.append(
+                f"{i}. {title}\n"
+                f"   Authors: {authors}\n"
+                f"   Year: {year}\n"
+                f"   Citations: {citations}\n"
+                f"   URL: {url}\n"
+                f"   Abstract: {abstract[:200]}...\n"
+                f"{self.SEP}\n\n"
+            )
         
-        for i, paper in enumerate(results, 1):
-            result_text = f"{i}. {paper['title']}\n"
-            result_text += f"   Authors: {paper['authors']}\n"
-            result_text += f"   Year: {paper['year']}\n"
-            result_text += f"   Citations: {paper['citations']}\n"
-            result_text += f"   URL: {paper['url']}\n"
-            result_text += f"   Abstract: {paper['abstract'][:200]}...\n"
-            result_text += "-" * 80 + "\n\n"
-            
-            self.results_text.insert(tk.END, result_text)
+        # One insert instead of one per paper, so the widget lays out only once
+        self.results_text.delete('1.0', tk.END)
+        self.results_text.insert('1.0', ''.join(parts))
     
     def save_csv(self):
         """Save results to CSV"""
-        if not self.scraper.results:
+        if not self.scraper.result_count():
             messagebox.showwarning("Warning", "No results to save")
             return
         
+        file_type = tk.StringVar(value="CSV files")
         filename = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=[("CSV files", "*.csv"), ("Gzipped CSV files", "*.csv.gz"), ("All files", "*.*")],
+            typevariable=file_type
         )
         
         if filename:
+            # The extension follows the chosen file type, so a bare name saved as gzip gets .csv.gz
+            filename = with_extension(filename, self.CSV_EXTENSIONS.get(file_type.get(), ".csv"))
             if self.scraper.save_to_csv(filename):
                 messagebox.showinfo("Success", f"Results saved to {filename}")
             else:
@@ -338,7 +536,7 @@ class ScraperGUI:
     
     def save_excel(self):
         """Save results to Excel"""
-        if not self.scraper.results:
+        if not self.scraper.result_count():
             messagebox.showwarning("Warning", "No results to save")
             return
         
@@ -356,7 +554,7 @@ class ScraperGUI:
     def clear_results(self):
         """Clear results"""
         self.results_text.delete('1.0', tk.END)
-        self.scraper.results = []
+        self.scraper.reset_results()
         self.update_progress("Results cleared. Ready to scrape...")
 
 def main():
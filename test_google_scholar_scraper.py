@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Regression tests for GoogleScholarScraper against a local mock Scholar server
+"""
+
+import csv
+import gzip
+import http.server
+import os
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from unittest import mock
+
+from openpyxl import load_workbook
+
+from google_scholar_scraper import RESULT_FIELDS, GoogleScholarScraper, with_extension
+
+
+def result_page(titles):
+    """Build a Scholar-like result page; a None title gives a result without h3.gs_rt"""
+    results = []
+    for title in titles:
+        heading = f'<h3 class="gs_rt"><a href="https://example.org/{title}">{title}</a></h3>' if title else ''
+        results.append(
+            f'<div class="gs_r gs_or gs_scl"><div class="gs_ri">{heading}'
+            f'<div class="gs_a">A Author - Journal, 2020</div>'
+            f'<div class="gs_fl"><a href="/scholar?cites=1">Cited by 7</a></div>'
+            f'</div></div>'
+        )
+    return f'<html><body>{"".join(results)}</body></html>'.encode()
+
+
+class MockScholar:
+    """Serve canned pages keyed by the 'start' parameter and count the hits"""
+
+    def __init__(self, pages, headers=None):
+        self.pages = pages  # start -> (status, body)
+        self.headers = headers or {}
+        self.hits = []
+        self.user_agents = []
+        mock_server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                start = int(query.get('start', ['0'])[0])
+                mock_server.hits.append(start)
+                mock_server.user_agents.append(self.headers.get('User-Agent'))
+                status, body = mock_server.pages.get(start, (200, result_page([])))
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in mock_server.headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/scholar'
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ScrapePapersTest(unittest.TestCase):
+    def setUp(self):
+        # Keep the response cache out of the user's cache directory
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.scraper = GoogleScholarScraper(cache_name=os.path.join(self.tmpdir.name, 'scholar_cache'))
+        patcher = mock.patch.object(self.scraper, 'get_random_delay', return_value=0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.scraper.session.close()
+        self.tmpdir.cleanup()
+
+    def scrape(self, pages, max_results, headers=None):
+        server = MockScholar(pages, headers)
+        self.addCleanup(server.close)
+        self.scraper.base_url = server.url
+        results = self.scraper.scrape_papers(['mock'], max_results=max_results)
+        return results, server
+
+    def test_failed_earlier_page_is_made_up_by_later_pages(self):
+        pages = {
+            0: (404, b'not found'),
+            10: (200, result_page([f'p1-{i}' for i in range(10)])),
+        }
+        results, _ = self.scrape(pages, max_results=15)
+        self.assertEqual(results['title'], [f'p1-{i}' for i in range(10)])
+
+    def test_short_earlier_page_is_made_up_by_later_pages(self):
+        page0 = [f'p0-{i}' for i in range(10)]
+        page1 = [f'p1-{i}' for i in range(10)]
+        page0[3] = page0[7] = None
+        pages = {
+            0: (200, result_page(page0)),
+            10: (200, result_page(page1)),
+        }
+        results, _ = self.scrape(pages, max_results=15)
+        expected = [t for t in page0 if t] + page1[:7]
+        self.assertEqual(results['title'], expected)
+        self.assertEqual(self.scraper.result_count(), 15)
+        self.assertEqual(results['citations'], ['7'] * 15)
+
+    def test_pages_after_an_empty_page_are_not_fetched(self):
+        pages = {
+            0: (200, result_page([f'p0-{i}' for i in range(10)])),
+            10: (200, result_page([f'p1-{i}' for i in range(5)])),
+        }
+        # Space requests far enough apart that the empty page is parsed before the next slot
+        with mock.patch.object(self.scraper, 'get_random_delay', return_value=0.2):
+            results, server = self.scrape(pages, max_results=100)
+        self.assertEqual(self.scraper.result_count(), 15)
+        # The four workers take their first pages together and get throttle slots in the order
+        # they win the rate lock, not in page order, so start=30 can hold an earlier slot than
+        # the empty start=20 page and go out before it is seen. Later pages only reserve a slot
+        # once a worker is free, and are dropped once the empty page has been parsed.
+        self.assertTrue({0, 10, 20} <= set(server.hits) <= {0, 10, 20, 30}, server.hits)
+
+    def test_unwanted_request_does_not_reserve_a_slot(self):
+        pages = {0: (200, result_page(['p0-0']))}
+        server = MockScholar(pages)
+        self.addCleanup(server.close)
+        with mock.patch.object(self.scraper, 'wait_for_slot') as wait_for_slot:
+            response = self.scraper.make_request(server.url, {'start': 0}, skip=lambda: True)
+        self.assertIsNone(response)
+        wait_for_slot.assert_not_called()
+        self.assertEqual(server.hits, [])
+
+    def test_blank_page_ends_results_instead_of_raising(self):
+        for body in (b'', b'  \n ', b'<!-- nothing here -->'):
+            with self.subTest(body=body):
+                self.scraper.session.cache.clear()
+                pages = {
+                    0: (200, result_page([f'p0-{i}' for i in range(10)])),
+                    10: (200, body),
+                    20: (200, result_page([f'p2-{i}' for i in range(10)])),
+                }
+                results, _ = self.scrape(pages, max_results=30)
+                self.assertEqual(results['title'], [f'p0-{i}' for i in range(10)])
+
+    def test_cache_hits_skip_the_network_and_the_throttle(self):
+        pages = {0: (200, result_page([f'p0-{i}' for i in range(10)]))}
+        _, server = self.scrape(pages, max_results=10)
+        self.assertEqual(server.hits, [0])
+        
+        with mock.patch.object(self.scraper, 'wait_for_slot') as wait_for_slot:
+            results = self.scraper.scrape_papers(['mock'], max_results=10)
+        self.assertEqual(server.hits, [0])
+        wait_for_slot.assert_not_called()
+        self.assertEqual(results['title'], [f'p0-{i}' for i in range(10)])
+
+    def test_pages_without_results_are_not_cached(self):
+        interstitial = b'<html><body><form id="captcha-form">unusual traffic</form></body></html>'
+        pages = {0: (200, interstitial)}
+        results, server = self.scrape(pages, max_results=10)
+        self.assertEqual(self.scraper.result_count(), 0)
+        
+        # Once Scholar serves results again, the next run must ask it rather than the cache
+        server.pages[0] = (200, result_page([f'p0-{i}' for i in range(10)]))
+        results = self.scraper.scrape_papers(['mock'], max_results=10)
+        self.assertEqual(server.hits, [0, 0])
+        self.assertEqual(self.scraper.result_count(), 10)
+
+    def test_every_network_request_is_throttled_and_rotates_user_agent(self):
+        # Vary: User-Agent turns most repeat requests into cache misses
+        pages = {start: (200, result_page([f'{start}-{i}' for i in range(10)])) for start in (0, 10, 20)}
+        _, server = self.scrape(pages, max_results=30, headers={'Vary': 'User-Agent'})
+        
+        with mock.patch.object(self.scraper, 'wait_for_slot') as wait_for_slot:
+            for _ in range(3):
+                self.scraper.scrape_papers(['mock'], max_results=30)
+        self.assertEqual(wait_for_slot.call_count, len(server.hits) - 3)
+        for user_agent in server.user_agents:
+            self.assertIn(user_agent, self.scraper.user_agents)
+
+    def test_retries_go_through_the_throttle(self):
+        # Skip urllib3's own backoff so the test only waits on the (mocked) throttle
+        self.scraper.session.get_adapter(self.scraper.base_url).max_retries.backoff_factor = 0
+        for status in (429, 503):
+            with self.subTest(status=status):
+                pages = {0: (status, b'slow down')}
+                with mock.patch.object(self.scraper, 'wait_for_slot') as wait_for_slot:
+                    results, server = self.scrape(pages, max_results=10)
+                self.assertEqual(self.scraper.result_count(), 0)
+                self.assertEqual(len(server.hits), 3)
+                self.assertEqual(wait_for_slot.call_count, len(server.hits))
+
+
+
+class SaveResultsTest(unittest.TestCase):
+    ROWS = [
+        ('Deep learning', 'Y LeCun, Y Bengio - Nature, 2015', '', '2015', '12345', '', 'https://example.org/a', 'Deep learning allows'),
+        ('Café, "quoted"\nand multi-line', 'A Author - 1998', '', '1998', '', '', '', ''),
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.scraper = GoogleScholarScraper(cache_name=os.path.join(self.tmpdir.name, 'scholar_cache'))
+        for row in self.ROWS:
+            for field, value in zip(RESULT_FIELDS, row):
+                self.scraper.results[field].append(value)
+
+    def tearDown(self):
+        self.scraper.session.close()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_csv_round_trip(self):
+        filename = self.path('results.csv')
+        self.assertTrue(self.scraper.save_to_csv(filename))
+        with open(filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows, [list(RESULT_FIELDS)] + [list(row) for row in self.ROWS])
+
+    def test_gzipped_csv_round_trip(self):
+        filename = self.path('results.csv.gz')
+        self.assertTrue(self.scraper.save_to_csv(filename))
+        with gzip.open(filename, 'rt', newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows, [list(RESULT_FIELDS)] + [list(row) for row in self.ROWS])
+
+    def test_excel_round_trip(self):
+        filename = self.path('results.xlsx')
+        self.assertTrue(self.scraper.save_to_excel(filename))
+        ws = load_workbook(filename).active
+        self.assertEqual(ws.title, 'Sheet1')
+        # openpyxl reads empty strings back as empty cells
+        expected = [RESULT_FIELDS] + [tuple(value or None for value in row) for row in self.ROWS]
+        self.assertEqual(list(ws.values), expected)
+
+    def test_nothing_saved_without_results(self):
+        self.scraper.reset_results()
+        self.assertFalse(self.scraper.save_to_csv(self.path('empty.csv')))
+        self.assertFalse(self.scraper.save_to_excel(self.path('empty.xlsx')))
+        self.assertFalse(os.path.exists(self.path('empty.csv')))
+        self.assertFalse(os.path.exists(self.path('empty.xlsx')))
+
+    def test_extension_follows_chosen_file_type(self):
+        self.assertEqual(with_extension('results', '.csv.gz'), 'results.csv.gz')
+        self.assertEqual(with_extension('results.csv', '.csv.gz'), 'results.csv.gz')
+        self.assertEqual(with_extension('results.csv.gz', '.csv.gz'), 'results.csv.gz')
+        self.assertEqual(with_extension('results', '.csv'), 'results.csv')
+        self.assertEqual(with_extension('results.csv.gz', '.csv'), 'results.csv.gz')
+        self.assertEqual(with_extension('results.txt', '.csv'), 'results.txt')
+
+
+if __name__ == "__main__":
+    unittest.main()